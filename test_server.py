@@ -4,16 +4,43 @@ Comprehensive test suite for the MCP server.
 Tests actual tool calls with real API requests.
 """
 
+import argparse
 import asyncio
-import json
 import logging
+import os
+import sys
 import time
-from typing import Dict, List, Any
-import jsonschema
-from jsonschema import ValidationError
+from typing import Callable, Dict, List, Any
+import orjson
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import best_match
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
 
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
+# Per-test progress goes through a plain-format logger so --quiet can skip it
+logger = logging.getLogger("test_server")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(logging.Formatter("%(message)s"))
+logger.addHandler(_handler)
+
+# Use fastjsonschema when installed; set YTMCP_USE_JSONSCHEMA=1 to force jsonschema
+USE_FASTJSONSCHEMA = fastjsonschema is not None and not os.getenv(
+    "YTMCP_USE_JSONSCHEMA"
+)
+
+# A compiled schema check returns an error message, or None if the instance is valid
+SchemaCheck = Callable[[Any], str | None]
+
+# Compiled checks keyed by canonical schema JSON, shared across tools and reloads
+_VALIDATOR_CACHE: Dict[bytes, SchemaCheck] = {}
+
 
 class TestResults:
     """Track test results and statistics."""
@@ -82,73 +109,105 @@ class TestResults:
 def load_test_cases() -> List[Dict[str, Any]]:
     """Load test cases from JSON file."""
     try:
-        with open("test_cases.json", "r") as f:
-            data = json.load(f)
+        with open("test_cases.json", "rb") as f:
+            data = orjson.loads(f.read())
         return data["test_cases"]
     except FileNotFoundError:
         print("❌ test_cases.json not found")
         return []
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"❌ Error parsing test_cases.json: {e}")
         return []
 
 
+def compile_schema(schema: Dict[str, Any]) -> SchemaCheck:
+    """Compile a schema into a reusable check function."""
+    if USE_FASTJSONSCHEMA:
+        # use_default=False keeps the validator from mutating test arguments
+        validate = fastjsonschema.compile(schema, use_default=False)
+
+        def check(instance: Any) -> str | None:
+            try:
+                validate(instance)
+            except fastjsonschema.JsonSchemaValueException as e:
+                return e.message
+            return None
+
+        return check
+
+    validator = Draft202012Validator(schema)
+
+    def check(instance: Any) -> str | None:
+        error = best_match(validator.iter_errors(instance))
+        return error.message if error is not None else None
+
+    return check
+
+
+def get_validator(schema: Dict[str, Any]) -> SchemaCheck:
+    """Return a cached compiled check for the schema, compiling it on first use."""
+    key = orjson.dumps(schema, option=orjson.OPT_SORT_KEYS)
+    check = _VALIDATOR_CACHE.get(key)
+    if check is None:
+        check = compile_schema(schema)
+        _VALIDATOR_CACHE[key] = check
+    return check
+
+
+def build_validators(
+    schemas: Dict[str, Any],
+) -> tuple[Dict[str, SchemaCheck], Dict[str, SchemaCheck]]:
+    """Compile input and output validators once per tool.
+
+    Schemas come from the server's loader, which has already inlined $refs.
+    """
+    input_validators = {}
+    output_validators = {}
+
+    for tool_name, tool_schema in schemas.items():
+        input_schema = tool_schema.get("inputSchema")
+        if input_schema:
+            input_validators[tool_name] = get_validator(input_schema)
+
+        output_schema = tool_schema.get("outputSchema")
+        if output_schema:
+            output_validators[tool_name] = get_validator(output_schema)
+
+    return input_validators, output_validators
+
+
 def validate_input_schema(
-    tool_name: str, arguments: Dict[str, Any], schemas: Dict[str, Any]
+    tool_name: str,
+    arguments: Dict[str, Any],
+    validator: SchemaCheck | None,
 ) -> tuple[bool, str]:
     """Validate input arguments against tool's input schema."""
-    if tool_name not in schemas:
-        return False, f"No schema found for tool {tool_name}"
-
-    tool_schema = schemas[tool_name]
-    input_schema = tool_schema.get("inputSchema")
-
-    if not input_schema:
+    if validator is None:
         return False, f"No input schema defined for tool {tool_name}"
 
     try:
-        jsonschema.validate(arguments, input_schema)
+        error = validator(arguments)
+        if error is not None:
+            return False, f"Input validation failed: {error}"
         return True, "Input validation passed"
-    except ValidationError as e:
-        return False, f"Input validation failed: {e.message}"
     except Exception as e:
         return False, f"Input validation error: {str(e)}"
 
 
 def validate_output_schema(
-    tool_name: str, result: Any, full_schema_data: Dict[str, Any]
+    tool_name: str,
+    result: Any,
+    validator: SchemaCheck | None,
 ) -> tuple[bool, str]:
     """Validate result against tool's output schema."""
-    # Get tool schemas from the full schema data
-    tools = full_schema_data.get("tools", [])
-    tool_schema = None
-
-    for tool in tools:
-        if tool.get("name") == tool_name:
-            tool_schema = tool
-            break
-
-    if not tool_schema:
-        return False, f"No schema found for tool {tool_name}"
-
-    output_schema = tool_schema.get("outputSchema")
-
-    if not output_schema:
+    if validator is None:
         return False, f"No output schema defined for tool {tool_name}"
 
     try:
-        # Resolve $ref definitions if they exist
-        definitions = full_schema_data.get("definitions", {})
-        if definitions:
-            # Create a complete schema with definitions for validation
-            complete_schema = {**output_schema, "definitions": definitions}
-        else:
-            complete_schema = output_schema
-
-        jsonschema.validate(result, complete_schema)
+        error = validator(result)
+        if error is not None:
+            return False, f"Output validation failed: {error}"
         return True, "Output validation passed"
-    except ValidationError as e:
-        return False, f"Output validation failed: {e.message}"
     except Exception as e:
         return False, f"Output validation error: {str(e)}"
 
@@ -181,11 +240,36 @@ def validate_schema_structure(schemas: Dict[str, Any]) -> List[str]:
     return issues
 
 
+def check_recursive_ref_inlining() -> str | None:
+    """Check that a self-referencing definition stays resolvable after inlining."""
+    from youtube_mcp_server.server import _inline_schema
+
+    definitions = {
+        "Node": {
+            "type": "object",
+            "properties": {
+                "children": {"type": "array", "items": {"$ref": "#/definitions/Node"}}
+            },
+        }
+    }
+    validator = Draft202012Validator(
+        _inline_schema({"$ref": "#/definitions/Node"}, definitions)
+    )
+
+    if not validator.is_valid({"children": [{"children": []}]}):
+        return "valid recursive instance was rejected"
+    if validator.is_valid({"children": [{"children": "not-a-list"}]}):
+        return "invalid recursive instance was accepted"
+    return None
+
+
 async def run_tool_test(
     tool_name: str,
     arguments: Dict[str, Any],
     test_case: Dict[str, Any],
-    schemas: Dict[str, Any],
+    input_validator: SchemaCheck | None,
+    output_validator: SchemaCheck | None,
+    validate_output: bool = False,
 ) -> tuple[bool, str, float, Dict[str, Any]]:
     """Run a single tool test case with comprehensive schema validation."""
     start_time = time.time()
@@ -199,7 +283,9 @@ async def run_tool_test(
         from youtube_mcp_server.server import TOOL_FUNCTIONS
 
         # 1. Validate input arguments against schema
-        input_valid, input_msg = validate_input_schema(tool_name, arguments, schemas)
+        input_valid, input_msg = validate_input_schema(
+            tool_name, arguments, input_validator
+        )
         validation_results["input_validation"] = {
             "valid": input_valid,
             "message": input_msg,
@@ -227,11 +313,29 @@ async def run_tool_test(
             if result is None:
                 return False, "Tool returned None", duration, validation_results
 
-            # 4. Validate output against schema - load full schema data
-            with open("youtube_mcp_server/tools.json", "r") as f:
-                full_schema_data = json.load(f)
+            # Check the number of returned items when the test case pins it
+            expected_count = test_case.get("expected_item_count")
+            if expected_count is not None:
+                item_count = len(result.get("items", []))
+                if item_count != expected_count:
+                    return (
+                        False,
+                        f"Expected {expected_count} items but got {item_count}",
+                        duration,
+                        validation_results,
+                    )
+
+            # 4. Validate output against the precompiled schema (opt-in)
+            if not validate_output:
+                return (
+                    True,
+                    f"Input validation passed - returned {type(result).__name__}",
+                    duration,
+                    validation_results,
+                )
+
             output_valid, output_msg = validate_output_schema(
-                tool_name, result, full_schema_data
+                tool_name, result, output_validator
             )
             validation_results["output_validation"] = {
                 "valid": output_valid,
@@ -276,10 +380,13 @@ async def test_server_components():
 
     try:
         # Import the server components
-        from youtube_mcp_server.server import load_tool_schemas, TOOL_FUNCTIONS
+        from youtube_mcp_server.server import TOOL_SCHEMAS, TOOL_FUNCTIONS
 
-        # Test schema loading
-        schemas = load_tool_schemas()
+        # Test schema loading (tools.json is parsed once, at server import)
+        schemas = TOOL_SCHEMAS
+        if not schemas:
+            print("❌ No tool schemas loaded from tools.json")
+            return False
         print(f"✅ Loaded {len(schemas)} tool schemas")
 
         # Test function mapping
@@ -308,15 +415,13 @@ async def test_server_components():
 
         print("✅ All schemas have corresponding functions")
 
-        # Test schema definitions loading
-        with open("youtube_mcp_server/tools.json", "r") as f:
-            full_schema_data = json.load(f)
+        # Validate that recursive $refs stay resolvable after inlining
+        inlining_issue = check_recursive_ref_inlining()
+        if inlining_issue:
+            print(f"❌ Recursive $ref inlining: {inlining_issue}")
+            return False
 
-        definitions = full_schema_data.get("definitions", {})
-        if definitions:
-            print(
-                f"✅ Loaded {len(definitions)} schema definitions for $ref resolution"
-            )
+        print("✅ Recursive $ref definitions resolve after inlining")
 
         return True, schemas
 
@@ -328,7 +433,11 @@ async def test_server_components():
         return False, {}
 
 
-async def run_tool_tests(schemas: Dict[str, Any]):
+async def run_tool_tests(
+    schemas: Dict[str, Any],
+    validate_output: bool = False,
+    concurrency: int = 4,
+):
     """Run all tool tests with real API calls and comprehensive schema validation."""
     print("\n🧪 Running Tool Tests with Schema Validation")
     print("-" * 50)
@@ -340,55 +449,76 @@ async def run_tool_tests(schemas: Dict[str, Any]):
 
     results = TestResults()
 
-    # Check if API key is available
+    # Compile schema validators once for the whole run
+    input_validators, output_validators = build_validators(schemas)
+
+    validation_scope = "input and output" if validate_output else "input"
+    print(
+        f"🚀 Running {len(test_cases)} test cases "
+        f"with {validation_scope} schema validation..."
+    )
 
-    print(f"🚀 Running {len(test_cases)} test cases with full schema validation...")
+    # Run test cases concurrently, bounded to stay within API quota
+    semaphore = asyncio.Semaphore(concurrency)
 
-    for i, test_case in enumerate(test_cases, 1):
+    async def run_bounded(index: int, test_case: Dict[str, Any]):
+        tool_name = test_case["tool"]
+        async with semaphore:
+            try:
+                outcome = await run_tool_test(
+                    tool_name,
+                    test_case["arguments"],
+                    test_case,
+                    input_validators.get(tool_name),
+                    output_validators.get(tool_name),
+                    validate_output,
+                )
+            except Exception as e:
+                outcome = e
+        return index, test_case, outcome
+
+    # Report each test case as soon as it finishes
+    pending = [run_bounded(i, test_case) for i, test_case in enumerate(test_cases, 1)]
+    for next_done in asyncio.as_completed(pending):
+        i, test_case, outcome = await next_done
         test_name = test_case["name"]
         tool_name = test_case["tool"]
         arguments = test_case["arguments"]
         description = test_case["description"]
 
-        print(f"\n[{i}/{len(test_cases)}] {test_name}")
-        print(f"    📝 {description}")
-        print(
-            f"    🔧 {tool_name}({', '.join(f'{k}={v}' for k, v in arguments.items())})"
-        )
-
-        try:
-            success, message, duration, validation_results = await run_tool_test(
-                tool_name, arguments, test_case, schemas
-            )
+        logger.info("\n[%d/%d] %s", i, len(test_cases), test_name)
+        logger.info("    📝 %s", description)
+        if logger.isEnabledFor(logging.INFO):
+            formatted_args = ", ".join(f"{k}={v}" for k, v in arguments.items())
+            logger.info("    🔧 %s(%s)", tool_name, formatted_args)
 
-            status_icon = "✅" if success else "❌"
-            print(f"    {status_icon} {message} ({duration:.2f}s)")
+        if isinstance(outcome, Exception):
+            logger.info("    ❌ Test execution failed: %s", outcome)
+            results.add_result(test_name, False, f"Test execution failed: {outcome}", 0)
+            continue
 
-            # Show detailed validation results
-            if validation_results.get("input_validation"):
-                input_val = validation_results["input_validation"]
-                input_icon = "✅" if input_val["valid"] else "❌"
-                print(f"       📥 Input: {input_icon} {input_val['message']}")
+        success, message, duration, validation_results = outcome
 
-            if validation_results.get("output_validation"):
-                output_val = validation_results["output_validation"]
-                output_icon = "✅" if output_val["valid"] else "❌"
-                print(f"       📤 Output: {output_icon} {output_val['message']}")
+        status_icon = "✅" if success else "❌"
+        logger.info("    %s %s (%.2fs)", status_icon, message, duration)
 
-            results.add_result(test_name, success, message, duration)
+        # Show detailed validation results
+        if validation_results.get("input_validation"):
+            input_val = validation_results["input_validation"]
+            input_icon = "✅" if input_val["valid"] else "❌"
+            logger.info("       📥 Input: %s %s", input_icon, input_val["message"])
 
-            # Add small delay between API calls to be respectful
-            if i < len(test_cases):
-                await asyncio.sleep(0.5)
+        if validation_results.get("output_validation"):
+            output_val = validation_results["output_validation"]
+            output_icon = "✅" if output_val["valid"] else "❌"
+            logger.info("       📤 Output: %s %s", output_icon, output_val["message"])
 
-        except Exception as e:
-            print(f"    ❌ Test execution failed: {e}")
-            results.add_result(test_name, False, f"Test execution failed: {e}", 0)
+        results.add_result(test_name, success, message, duration)
 
     return results
 
 
-async def main():
+async def main(validate_output: bool = False, concurrency: int = 4):
     """Main test runner with comprehensive schema validation."""
     # Test server components first
     components_result = await test_server_components()
@@ -404,7 +534,7 @@ async def main():
         return
 
     # Run tool tests with schema validation
-    results = await run_tool_tests(schemas)
+    results = await run_tool_tests(schemas, validate_output, concurrency)
 
     # Print summary
     results.print_summary()
@@ -412,7 +542,10 @@ async def main():
     # Print enhanced usage info
     print("\n💡 Enhanced Schema Validation Features:")
     print("  🔍 Input parameters validated against JSON Schema")
-    print("  🔍 Output responses validated against JSON Schema")
+    if validate_output:
+        print("  🔍 Output responses validated against JSON Schema")
+    else:
+        print("  ⏭️  Output validation skipped (enable with --validate-output)")
     print("  🔍 Schema structure validation with definitions")
     print("  🔍 Comprehensive error reporting")
     print("\n💡 Usage Information:")
@@ -422,5 +555,39 @@ async def main():
     print("  • Server ready for MCP client connections")
 
 
+def positive_int(value: str) -> int:
+    """Parse a positive integer command-line value."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return number
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--validate-output",
+        action="store_true",
+        default=bool(os.getenv("YTMCP_VALIDATE_OUTPUT")),
+        help="Validate tool results against their output schemas "
+        "(also enabled by YTMCP_VALIDATE_OUTPUT)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=os.getenv("YTMCP_TEST_CONCURRENCY", "4"),
+        help="Maximum number of test cases running at once "
+        "(default: YTMCP_TEST_CONCURRENCY or 4)",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only print the summary, not per-test progress",
+    )
+    args = parser.parse_args()
+    if args.quiet:
+        logger.setLevel(logging.WARNING)
+    asyncio.run(main(args.validate_output, args.concurrency))
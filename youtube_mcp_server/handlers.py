@@ -1,8 +1,12 @@
+import asyncio
+import logging
 import os
+import threading
 from typing import Dict, List, Any
 from dotenv import load_dotenv
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import (
     TranscriptsDisabled,
@@ -15,11 +19,41 @@ import re
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
+logger = logging.getLogger("YouTubeMCP")
 
-def validate_youtube_api_key() -> None:
-    """Validate that YouTube API key is available."""
-    if not YOUTUBE_API_KEY:
-        raise ValueError("YOUTUBE_API_KEY environment variable is required")
+# Checked once at import; the YouTube Data API tools re-check before each call
+if not YOUTUBE_API_KEY:
+    logger.warning("YOUTUBE_API_KEY is not set; search_videos and get_videos will fail")
+
+_API_KEY_ERROR = "YOUTUBE_API_KEY environment variable is required"
+
+# ISO 8601 PT duration format (e.g., PT4M13S, PT1H2M30S)
+_DURATION_RE = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
+
+# Video resource parts accepted by get_videos
+_VALID_PARTS = frozenset(
+    {
+        "snippet",
+        "contentDetails",
+        "statistics",
+        "status",
+        "player",
+        "recordingDetails",
+        "fileDetails",
+        "processingDetails",
+        "suggestions",
+        "liveStreamingDetails",
+        "localizations",
+        "topicDetails",
+    }
+)
+
+# Shared YouTube API client, built lazily on first use
+_YT_SERVICE = None
+_YT_SERVICE_LOCK = asyncio.Lock()
+
+# httplib2.Http is not thread-safe, so each worker thread gets its own transport
+_THREAD_LOCAL = threading.local()
 
 
 def parse_duration(duration_str: str) -> int:
@@ -27,24 +61,42 @@ def parse_duration(duration_str: str) -> int:
     if not duration_str:
         return 0
 
-    # Parse PT format (e.g., PT4M13S, PT1H2M30S)
-    pattern = r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?"
-    match = re.match(pattern, duration_str)
+    match = _DURATION_RE.match(duration_str)
 
     if not match:
         return 0
 
-    hours = int(match.group(1)) if match.group(1) else 0
-    minutes = int(match.group(2)) if match.group(2) else 0
-    seconds = int(match.group(3)) if match.group(3) else 0
+    hours, minutes, seconds = match.groups(default="0")
 
-    return hours * 3600 + minutes * 60 + seconds
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
 
 
 def build_youtube_service():
     """Build YouTube API service client."""
-    validate_youtube_api_key()
-    return build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+    return build("youtube", "v3", developerKey=YOUTUBE_API_KEY, cache_discovery=False)
+
+
+async def _get_service():
+    """Return the shared YouTube API client, building it on first use.
+
+    The discovery build is synchronous, so it runs in a worker thread; the lock
+    keeps concurrent first calls from building it twice.
+    """
+    global _YT_SERVICE
+    if _YT_SERVICE is None:
+        async with _YT_SERVICE_LOCK:
+            if _YT_SERVICE is None:
+                _YT_SERVICE = await asyncio.to_thread(build_youtube_service)
+    return _YT_SERVICE
+
+
+def _execute(request):
+    """Execute an API request using the calling thread's own Http transport."""
+    http = getattr(_THREAD_LOCAL, "http", None)
+    if http is None:
+        http = build_http()
+        _THREAD_LOCAL.http = http
+    return request.execute(http=http)
 
 
 async def search_videos(query: str, pageToken: str = None) -> Dict[str, Any]:
@@ -62,9 +114,12 @@ async def search_videos(query: str, pageToken: str = None) -> Dict[str, Any]:
     if not query or not query.strip():
         raise ValueError("query parameter is required and cannot be empty")
 
+    if not YOUTUBE_API_KEY:
+        raise ValueError(_API_KEY_ERROR)
+
     try:
-        # Build YouTube service
-        youtube = build_youtube_service()
+        # Reuse the shared YouTube service
+        youtube = await _get_service()
 
         # Perform search
         search_params = {
@@ -78,16 +133,18 @@ async def search_videos(query: str, pageToken: str = None) -> Dict[str, Any]:
         if pageToken:
             search_params["pageToken"] = pageToken
 
-        search_response = youtube.search().list(**search_params).execute()
+        search_response = await asyncio.to_thread(
+            _execute, youtube.search().list(**search_params)
+        )
 
         # Process results - convert search results to the expected format
-        items = []
-        for item in search_response["items"]:
-            processed_item = {
+        items = [
+            {
                 "id": {"kind": item["id"]["kind"], "videoId": item["id"]["videoId"]},
                 "snippet": item["snippet"],
             }
-            items.append(processed_item)
+            for item in search_response["items"]
+        ]
 
         # Build response
         result = {
@@ -131,58 +188,53 @@ async def get_videos(ids: List[str], parts: List[str] = None) -> Dict[str, Any]:
     if not ids:
         raise ValueError("ids parameter is required and cannot be empty")
 
-    if len(ids) > 50:
+    # Validate all IDs are non-empty strings
+    if not all(isinstance(video_id, str) for video_id in ids):
+        raise ValueError("All video IDs must be strings")
+
+    stripped_ids = [video_id.strip() for video_id in ids]
+    if not all(stripped_ids):
+        raise ValueError("Video IDs cannot be empty")
+
+    # Drop duplicate IDs, keeping request order
+    video_ids = list(dict.fromkeys(stripped_ids))
+
+    if len(video_ids) > 50:
         raise ValueError("Maximum 50 video IDs allowed per request")
 
-    # Validate all IDs are non-empty strings
-    for video_id in ids:
-        if not video_id or not isinstance(video_id, str) or not video_id.strip():
-            raise ValueError("All video IDs must be non-empty strings")
+    if not YOUTUBE_API_KEY:
+        raise ValueError(_API_KEY_ERROR)
 
     # Default parts if not provided
     if parts is None:
         parts = ["snippet"]
 
     # Validate parts
-    valid_parts = {
-        "snippet",
-        "contentDetails",
-        "statistics",
-        "status",
-        "player",
-        "recordingDetails",
-        "fileDetails",
-        "processingDetails",
-        "suggestions",
-        "liveStreamingDetails",
-        "localizations",
-        "topicDetails",
-    }
-    invalid_parts = set(parts) - valid_parts
+    invalid_parts = [part for part in parts if part not in _VALID_PARTS]
     if invalid_parts:
         raise ValueError(
-            f"Invalid parts: {invalid_parts}. Valid parts are: {valid_parts}"
+            f"Invalid parts: {invalid_parts}. "
+            f"Valid parts are: {', '.join(sorted(_VALID_PARTS))}"
         )
 
     try:
-        # Build YouTube service
-        youtube = build_youtube_service()
+        # Reuse the shared YouTube service
+        youtube = await _get_service()
 
         # Get detailed video information
-        videos_response = (
-            youtube.videos().list(part=",".join(parts), id=",".join(ids)).execute()
-        )
-
-        # Process results and add parsed duration for contentDetails
-        items = []
-        for video in videos_response["items"]:
-            # Add parsed duration in seconds for convenience if contentDetails is requested
-            if "contentDetails" in parts and "contentDetails" in video:
-                if "duration" in video["contentDetails"]:
-                    video["contentDetails"]["durationSeconds"] = parse_duration(
-                        video["contentDetails"]["duration"]
+        request = youtube.videos().list(part=",".join(parts), id=",".join(video_ids))
+        videos_response = await asyncio.to_thread(_execute, request)
+
+        items = videos_response["items"]
+
+        # Add parsed duration in seconds for convenience if contentDetails is requested
+        if "contentDetails" in parts:
+            for video in items:
+                content_details = video.get("contentDetails")
+                if content_details and "duration" in content_details:
+                    content_details["durationSeconds"] = parse_duration(
+                        content_details["duration"]
                     )
-            items.append(video)
 
         # Build response
         result = {
@@ -224,47 +276,24 @@ async def get_video_transcript(videoId: str, language: str = None) -> Dict[str,
     try:
         # Create API instance and get transcript list
         api = YouTubeTranscriptApi()
-        transcript_list = api.list(video_id)
-
-        # Try to find transcript in preferred order: requested language -> English -> manual -> any
-        transcript = None
-        language_code = None
-
-        # 1. Try requested language first (if provided)
-        if language and language.strip():
-            try:
-                transcript = transcript_list.find_transcript([language.strip()])
-                language_code = language.strip()
-            except NoTranscriptFound:
-                pass
-
-        # 2. If no requested language found, try English
-        if transcript is None:
-            try:
-                transcript = transcript_list.find_transcript(["en"])
-                language_code = "en"
-            except NoTranscriptFound:
-                pass
-
-        # 3. If no English, try to get any manually created transcript
-        if transcript is None:
-            try:
-                for t in transcript_list:
-                    if not t.is_generated:  # Prefer manual transcripts
-                        transcript = t
-                        language_code = t.language_code
-                        break
-            except StopIteration:
-                pass
-
-        # 4. If no manual transcripts, use any available
-        if transcript is None:
-            try:
-                transcript = next(iter(transcript_list))
-                language_code = transcript.language_code
-            except StopIteration:
-                # No transcripts available at all
-                pass
+        transcript_list = await asyncio.to_thread(api.list, video_id)
+
+        # Materialize the list once and index it by language code. Manual
+        # transcripts are listed first, so setdefault keeps them over generated ones.
+        all_transcripts = list(transcript_list)
+        by_language = {}
+        for t in all_transcripts:
+            by_language.setdefault(t.language_code, t)
+
+        # Pick transcript in preferred order:
+        # requested language -> English -> manual -> any
+        requested = language.strip() if language else ""
+        transcript = (
+            (by_language.get(requested) if requested else None)
+            or by_language.get("en")
+            or next((t for t in all_transcripts if not t.is_generated), None)
+            or (all_transcripts[0] if all_transcripts else None)
+        )
 
         if transcript is None:
             return {
@@ -275,24 +304,19 @@ async def get_video_transcript(videoId: str, language: str = None) -> Dict[str,
             }
 
         # Fetch the actual transcript data
-        transcript_data = transcript.fetch()
-
-        # Format transcript data to match our schema
-        formatted_transcript = []
-        for entry in transcript_data:
-            formatted_transcript.append(
-                {
-                    "text": entry.text,
-                    "start": float(entry.start),
-                    "duration": float(entry.duration),
-                }
-            )
+        transcript_data = await asyncio.to_thread(transcript.fetch)
+
+        # Format transcript data to match our schema (start/duration are already floats)
+        formatted_transcript = [
+            {"text": entry.text, "start": entry.start, "duration": entry.duration}
+            for entry in transcript_data
+        ]
 
         return {
             "videoId": video_id,
             "transcript": formatted_transcript,
             "available": True,
-            "language": language_code,
+            "language": transcript.language_code,
         }
 
     except TranscriptsDisabled:
@@ -1,8 +1,8 @@
-import json
 import logging
 import os
 from typing import Any
 
+import orjson
 from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 import mcp.server.stdio
@@ -23,6 +23,50 @@ def _package_path(filename: str) -> str:
     return os.path.join(base_dir, filename)
 
 
+def _inline_refs(
+    schema: Any, definitions: dict[str, Any], seen: frozenset[str] = frozenset()
+) -> Any:
+    """Replace local `#/definitions/X` refs with copies of the definition.
+
+    Recursive definitions are left as `$ref` once a cycle is detected.
+    """
+    if isinstance(schema, list):
+        return [_inline_refs(item, definitions, seen) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#/definitions/"):
+        name = ref[len("#/definitions/") :]
+        if name in definitions and name not in seen:
+            return _inline_refs(definitions[name], definitions, seen | {name})
+        return schema
+
+    return {
+        key: _inline_refs(value, definitions, seen) for key, value in schema.items()
+    }
+
+
+def _has_definition_ref(schema: Any) -> bool:
+    """Return True if any `#/definitions/X` ref remains in the schema."""
+    if isinstance(schema, list):
+        return any(_has_definition_ref(item) for item in schema)
+    if not isinstance(schema, dict):
+        return False
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#/definitions/"):
+        return True
+    return any(_has_definition_ref(value) for value in schema.values())
+
+
+def _inline_schema(schema: dict[str, Any], definitions: dict[str, Any]) -> Any:
+    """Inline a tool schema's refs, keeping definitions for any recursive ones."""
+    inlined = _inline_refs(schema, definitions)
+    if isinstance(inlined, dict) and _has_definition_ref(inlined):
+        inlined["definitions"] = definitions
+    return inlined
+
+
 def load_tool_schemas() -> dict[str, Any]:
     """Load tool schemas bundled in the package."""
     # Prefer package copy; fall back to CWD for local dev
@@ -32,12 +76,20 @@ def load_tool_schemas() -> dict[str, Any]:
     ]
     for path in candidates:
         try:
-            with open(path, "r") as f:
-                schema_data = json.load(f)
-            return {tool["name"]: tool for tool in schema_data["tools"]}
+            with open(path, "rb") as f:
+                schema_data = orjson.loads(f.read())
+            definitions = schema_data.get("definitions", {})
+            tools = {}
+            for tool in schema_data["tools"]:
+                if definitions:
+                    for key in ("inputSchema", "outputSchema"):
+                        if key in tool:
+                            tool[key] = _inline_schema(tool[key], definitions)
+                tools[tool["name"]] = tool
+            return tools
         except FileNotFoundError:
             continue
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Error parsing tools.json at {path}: {e}")
             return {}
     logger.error("tools.json file not found in package or working directory")
@@ -45,26 +97,30 @@ def load_tool_schemas() -> dict[str, Any]:
 
 
 TOOL_SCHEMAS = load_tool_schemas()
+
+# Tool definitions are static, so build them once instead of per list_tools request
+_TOOL_LIST: list[types.Tool] = [
+    types.Tool(
+        name=tool_name,
+        description=tool_schema["description"],
+        inputSchema=tool_schema["inputSchema"],
+        outputSchema=tool_schema["outputSchema"],
+    )
+    for tool_name, tool_schema in TOOL_SCHEMAS.items()
+]
+
 server = Server("YouTubeAPI")
 
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
-    tools: list[types.Tool] = []
-    for tool_name, tool_schema in TOOL_SCHEMAS.items():
-        tools.append(
-            types.Tool(
-                name=tool_name,
-                description=tool_schema["description"],
-                inputSchema=tool_schema["inputSchema"],
-                outputSchema=tool_schema["outputSchema"],
-            )
-        )
-    return tools
+    return list(_TOOL_LIST)
 
 
 @server.call_tool()
-async def handle_call_tool(name: str, arguments: dict[str, Any] | None) -> Any:
+async def handle_call_tool(
+    name: str, arguments: dict[str, Any] | None
+) -> types.CallToolResult:
     if name not in TOOL_FUNCTIONS:
         raise ValueError(f"Unknown tool: {name}")
 
@@ -74,11 +130,18 @@ async def handle_call_tool(name: str, arguments: dict[str, Any] | None) -> Any:
     try:
         tool_function = TOOL_FUNCTIONS[name]
         result = await tool_function(**arguments)
-        return result
     except Exception as e:
         logger.error(f"Error calling tool {name}: {e}")
         raise ValueError(f"Tool execution error: {str(e)}")
 
+    # Returning a CallToolResult skips mcp's per-call outputSchema validation;
+    # handlers already build results in the documented shape
+    text = orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=text)],
+        structuredContent=result,
+    )
+
 
 async def run_server() -> None:
     async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):